@@ -13,6 +13,7 @@ setup(
     install_requires=[
         # list dependencies here
         "matplotlib",
+        "numba",
         "numpy",
         "scipy",
     ],
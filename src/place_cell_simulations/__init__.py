@@ -1,14 +1,17 @@
-from .movement import generate_trajectory
+from .movement import generate_trajectory, generate_trajectories_batch
 from .spikes import generate_place_cell_spikes, generate_noise_cell_spikes
-from .utils import compute_empirical_rate_maps, compute_theoretical_rate_maps, save_dataset
+from .utils import Binner, compute_empirical_rate_maps, iter_empirical_rate_maps, compute_theoretical_rate_maps, save_dataset
 from .plots import occupancy_plot, plot_position, plot_spike_raster, plot_empirical_vs_theoretical_rate, plot_rate_maps
 
 __all__ = [
     "generate_trajectory",
+    "generate_trajectories_batch",
     "save_dataset",
+    "Binner",
     "generate_place_cell_spikes",
     "generate_noise_cell_spikes",
     "compute_empirical_rate_maps",
+    "iter_empirical_rate_maps",
     "compute_theoretical_rate_maps",
     "occupancy_plot",
     "plot_position",
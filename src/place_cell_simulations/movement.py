@@ -4,7 +4,146 @@
 Trajectory generation
 """
 from typing import Dict, Optional
+import math
 import numpy as np
+from numba import njit, prange
+from scipy.signal import lfilter
+
+# below this many trajectories, thread start-up costs more than running the batch serially
+_PARALLEL_MIN_TRAJ = 4
+
+
+@njit(cache=True, fastmath=True)
+def _ou_step_loop(n_steps, dt, theta, mu, v0, track_length, noise):
+    """
+    Integrate OU velocity to position with reflecting boundaries. `noise` holds the pre-scaled
+    increments sigma * sqrt(dt) * N(0, 1), one per step.
+    """
+    pos = np.zeros(n_steps, dtype=np.float32)
+    vel = np.zeros(n_steps, dtype=np.float32)
+    pos[0] = 0.5  # start in middle
+    vel[0] = v0
+
+    theta_dt = theta * dt
+    for t in range(n_steps - 1):
+        v = vel[t] + theta_dt * (mu - vel[t]) + noise[t]
+        p = pos[t] + v * dt
+        # reflect at boundaries
+        if p < 0:
+            p = -p
+            v = -v
+        elif p > track_length:
+            p = 2*track_length - p
+            v = -v
+        vel[t+1] = v
+        pos[t+1] = p
+
+    return pos, vel
+
+
+def _ou_fold(dt: float, theta: float, v0: float, track_length: float, noise: np.ndarray):
+    """
+    Vectorized equivalent of _ou_step_loop for mu = 0, along the last axis of `noise`.
+
+    With mu = 0 the OU process is symmetric, so flipping the velocity at each wall is equivalent
+    (in distribution) to integrating freely and folding the path back onto the track afterwards.
+    The AR(1) recurrence v[t+1] = (1 - theta*dt) * v[t] + noise[t] is then a single linear filter.
+    """
+    v_start = np.full(noise.shape[:-1] + (1,), v0)
+    vel = lfilter([1.0], [1.0, -(1.0 - theta * dt)], np.concatenate((v_start, noise), axis=-1), axis=-1)
+    displacement = np.cumsum(vel[..., 1:], axis=-1) * dt
+    unfolded = 0.5 + np.concatenate((np.zeros_like(v_start), displacement), axis=-1)  # start in middle
+    # reflect at boundaries: triangle-wave fold, velocity flips sign on the descending half
+    folded = unfolded % (2 * track_length)
+    pos = (track_length - np.abs(folded - track_length)).astype(np.float32)
+    vel = np.where(folded > track_length, -vel, vel).astype(np.float32)
+    return pos, vel
+
+
+# The serial and parallel batch kernels are separate functions on purpose: numba keys its on-disk cache
+# by function, so two dispatchers wrapping the same function would share (and overwrite) one cache entry.
+@njit(cache=True)
+def _ou_batch_serial(n_steps, dt, theta, mu, v0, track_length, noise):
+    """
+    Run _ou_step_loop once per row of `noise`, shape (n_traj, n_steps - 1).
+    """
+    n_traj = noise.shape[0]
+    pos = np.empty((n_traj, n_steps), dtype=np.float32)
+    vel = np.empty((n_traj, n_steps), dtype=np.float32)
+    for k in range(n_traj):
+        pos_k, vel_k = _ou_step_loop(n_steps, dt, theta, mu, v0, track_length, noise[k])
+        pos[k] = pos_k
+        vel[k] = vel_k
+
+    return pos, vel
+
+
+@njit(cache=True, parallel=True)
+def _ou_batch_parallel(n_steps, dt, theta, mu, v0, track_length, noise):
+    """
+    Same as _ou_batch_serial, with trajectories distributed across threads.
+    """
+    n_traj = noise.shape[0]
+    pos = np.empty((n_traj, n_steps), dtype=np.float32)
+    vel = np.empty((n_traj, n_steps), dtype=np.float32)
+    for k in prange(n_traj):
+        pos_k, vel_k = _ou_step_loop(n_steps, dt, theta, mu, v0, track_length, noise[k])
+        pos[k] = pos_k
+        vel[k] = vel_k
+
+    return pos, vel
+
+
+@njit(cache=True, fastmath=True)
+def _undersampling_step_loop(n_steps, dt, theta, mu, v0, track_length, last_zone, p_reject, noise, uniforms):
+    """
+    Undersampling trajectory loop. `noise` holds the pre-scaled OU increments and `uniforms` the
+    U(0, 1) draws used to decide whether an entry into the last zone is rejected.
+    """
+    pos = np.zeros(n_steps, dtype=np.float32)
+    speed = np.zeros(n_steps, dtype=np.float32)   # non-negative speed magnitude
+    direction = np.ones(n_steps, dtype=np.int8)   # +1 = moving right, -1 = moving left
+
+    pos[0] = 0.0        # start at left end (0.0)
+    speed[0] = v0
+    direction[0] = +1   # start moving to the right
+
+    theta_dt = theta * dt
+    for t in range(n_steps - 1):
+        # update speed (OU on the magnitude, reflect at zero)
+        s = speed[t] + theta_dt * (mu - speed[t]) + noise[t]
+        if s < 0:
+            s = 0.0
+
+        # tentative next position
+        next_pos = pos[t] + direction[t] * s * dt
+
+        # If moving right and attempting to enter last zone, probabilistically reject / reflect
+        if direction[t] == 1 and pos[t] < last_zone and next_pos >= last_zone and uniforms[t] < p_reject:
+            # reject the attempted entry: reflect to just inside last_zone
+            next_pos = last_zone - (next_pos - last_zone)
+            # damp and reverse a bit to encourage moving left afterwards
+            s = s * 0.5
+            direction[t+1] = -1
+        elif next_pos < 0.0:
+            # handle boundary hits: reflect and flip direction
+            next_pos = -next_pos
+            direction[t+1] = +1  # move right after bounce
+            # optionally damp speed a bit
+            s = s * 0.6
+        elif next_pos > track_length:
+            next_pos = track_length - (next_pos - track_length)
+            direction[t+1] = -1  # move left after bounce
+            s = s * 0.6
+        else:
+            # otherwise keep same direction
+            direction[t+1] = direction[t]
+
+        # commit speed and position
+        speed[t+1] = s
+        pos[t+1] = min(max(next_pos, 0.0), track_length)
+
+    return pos, speed
 
 
 def generate_trajectory(track_length: float = 1.0, dt: float = 0.005, duration_s: float = 300.0, 
@@ -14,29 +153,21 @@ def generate_trajectory(track_length: float = 1.0, dt: float = 0.005, duration_s
     Simulate a 1D trajectory along a linear track using an Ornstein-Uhlenbeck process for velocity.
 
     Returns a dict with keys: "time" (s), "position" (m), "velocity" (m/s), and "meta" (dict of parameters).
+    Position and velocity are float32, which is ample for positions on a metre-scale track and halves the 
+    memory traffic of downstream rate computations; time and the meta parameters stay float64.
     """
     # set random seed
     rng = np.random.default_rng(seed)
     n_steps = int(np.ceil(duration_s/ dt))
     time = np.arange(n_steps) * dt
 
-    # Initialize arrays
-    pos = np.zeros(n_steps)
-    vel = np.zeros(n_steps)
-    pos[0] = 0.5  # start in middle
-    vel[0] = v0
-
     # simulate velocity (OU) and integrate to position with reflecting boundaries
-    for t in range(n_steps - 1):
-        vel[t+1] = vel[t] + theta * (mu - vel[t]) * dt + sigma * np.sqrt(dt) * rng.standard_normal()
-        pos[t+1] = pos[t] + vel[t+1] * dt
-        # reflect at boundaries
-        if pos[t+1] < 0:
-            pos[t+1] = -pos[t+1]
-            vel[t+1] = -vel[t+1]
-        elif pos[t+1] > track_length:
-            pos[t+1] = 2*track_length - pos[t+1]
-            vel[t+1] = -vel[t+1]
+    noise = rng.standard_normal(n_steps - 1, dtype=np.float32)
+    noise *= np.float32(sigma * math.sqrt(dt))
+    if mu == 0.0:
+        pos, vel = _ou_fold(dt, theta, v0, track_length, noise)
+    else:
+        pos, vel = _ou_step_loop(n_steps, float(dt), float(theta), float(mu), float(v0), float(track_length), noise)
 
     # return parameters used for simulating movement
     meta = {
@@ -51,6 +182,49 @@ def generate_trajectory(track_length: float = 1.0, dt: float = 0.005, duration_s
 
     return {"time": time, "pos": pos, "velocity": vel, "meta": meta}
 
+def generate_trajectories_batch(n_traj: int, track_length: float = 1.0, dt: float = 0.005, duration_s: float = 300.0,
+                                theta: float = 1.0, mu: float = 0.0, sigma: float = 0.4, v0: float = 0.0,
+                                seed: Optional[int] = 42) -> Dict[str, np.ndarray]:
+    """
+    Simulate n_traj independent 1D trajectories along a linear track, as in generate_trajectory.
+
+    Trajectory k uses a random generator seeded with seed + k and equals generate_trajectory(seed=seed + k).
+    With mu = 0 the whole batch is integrated in closed form; otherwise trajectories are simulated in 
+    parallel when there are enough of them to pay for the threads.
+
+    Returns a dict with keys: "time" (s), "position" (m) and "velocity" (m/s) of shape (n_traj, n_steps), 
+    and "meta" (dict of parameters).
+    """
+    n_steps = int(np.ceil(duration_s/ dt))
+    time = np.arange(n_steps) * dt
+
+    # one generator per trajectory so each run is reproducible on its own
+    noise = np.empty((n_traj, n_steps - 1), dtype=np.float32)
+    for k in range(n_traj):
+        rng = np.random.default_rng(seed + k if seed is not None else None)
+        rng.standard_normal(dtype=np.float32, out=noise[k])
+    noise *= np.float32(sigma * math.sqrt(dt))
+
+    if mu == 0.0:
+        pos, vel = _ou_fold(dt, theta, v0, track_length, noise)
+    else:
+        batch_loop = _ou_batch_parallel if n_traj >= _PARALLEL_MIN_TRAJ else _ou_batch_serial
+        pos, vel = batch_loop(n_steps, float(dt), float(theta), float(mu), float(v0), float(track_length), noise)
+
+    # return parameters used for simulating movement
+    meta = {
+        "track_length": float(track_length),
+        "dt": float(dt),
+        "duration_s": float(duration_s),
+        "theta": float(theta),
+        "mu": float(mu),
+        "sigma": float(sigma),
+        "seed": int(seed) if seed is not None else None,
+        "n_traj": int(n_traj),
+    }
+
+    return {"time": time, "pos": pos, "velocity": vel, "meta": meta}
+
 def generate_trajectory_with_undersampling(track_length: float = 1.0, dt: float = 0.005, duration_s: float = 300.0, 
                         theta: float = 1.0, mu: float = 0.0, sigma: float = 0.4, v0: float = 0.0, last_zone_frac: float = 0.1,
                         p_reject: float = 0.85, seed: Optional[int] = 42) -> Dict[str, np.ndarray]:
@@ -71,61 +245,14 @@ def generate_trajectory_with_undersampling(track_length: float = 1.0, dt: float
     n_steps = int(np.ceil(duration_s/ dt))
     time = np.arange(n_steps) * dt
 
-    # Initial state
-    pos = np.zeros(n_steps, dtype=np.float32)
-    speed = np.zeros(n_steps, dtype=np.float32)   # non-negative speed magnitude
-    direction = np.ones(n_steps, dtype=np.int8)   # +1 = moving right, -1 = moving left
-
-    pos[0] = 0.0        # start at left end (0.0)
-    speed[0] = v0
-    direction[0] = +1   # start moving to the right
-
     # -----------------------
     # Simulation loop
     # -----------------------
-    for t in range(n_steps - 1):
-        # update speed (OU on the magnitude, reflect at zero)
-        ds = theta * (mu - speed[t]) * dt + sigma * np.sqrt(dt) * rng.standard_normal()
-        speed[t+1] = speed[t] + ds
-        if speed[t+1] < 0:
-            speed[t+1] = 0.0
-
-        # tentative next position
-        next_pos = pos[t] + direction[t] * speed[t+1] * dt
-
-        # If moving right and attempting to enter last zone, probabilistically reject / reflect
-        if direction[t] == 1 and pos[t] < last_zone and next_pos >= last_zone:
-            if rng.random() < p_reject:
-                # reject the attempted entry: reflect to just inside last_zone
-                # compute overshoot and reflect
-                overshoot = next_pos - last_zone
-                next_pos = last_zone - overshoot
-                # damp and reverse a bit to encourage moving left afterwards
-                speed[t+1] = speed[t+1] * 0.5
-                direction[t+1] = -1
-                # store and continue
-                pos[t+1] = np.clip(next_pos, 0.0, track_length)
-                continue
-
-        # handle boundary hits: if we exceed right end or go below 0, reflect and flip direction
-        if next_pos < 0.0:
-            # reflect and flip
-            overshoot = -next_pos
-            next_pos = overshoot
-            direction[t+1] = +1  # move right after bounce
-            # optionally damp speed a bit
-            speed[t+1] = speed[t+1] * 0.6
-        elif next_pos > track_length:
-            overshoot = next_pos - track_length
-            next_pos = track_length - overshoot
-            direction[t+1] = -1  # move left after bounce
-            speed[t+1] = speed[t+1] * 0.6
-        else:
-            # otherwise keep same direction
-            direction[t+1] = direction[t]
-
-        # commit position
-        pos[t+1] = np.clip(next_pos, 0.0, track_length)
+    noise = rng.standard_normal(n_steps - 1, dtype=np.float32)
+    noise *= np.float32(sigma * math.sqrt(dt))
+    uniforms = rng.random(n_steps - 1, dtype=np.float32)
+    pos, speed = _undersampling_step_loop(n_steps, float(dt), float(theta), float(mu), float(v0), float(track_length),
+                                          float(last_zone), float(p_reject), noise, uniforms)
 
     # return parameters used for simulating movement
     meta = {
@@ -2,19 +2,24 @@
 Plots for visualizing trajectories and neural activity.
 """
 
+from typing import Iterable, Optional, Tuple, Union
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
 from scipy.ndimage import gaussian_filter1d
 
+from .utils import Binner
+
 
 def occupancy_plot(pos: np.ndarray, track_length: float, n_bins: int):
     """
     Plot occupancy histogram.
     """
-    bins = np.linspace(0.0, track_length, n_bins + 1)
-    hist, _ = np.histogram(pos, bins=bins)
+    binner = Binner.from_track(track_length, n_bins)
+    hist = np.bincount(binner.indices(pos), minlength=n_bins)
     occupancy = hist.astype(float) / hist.sum()
-    centers_plot = 0.5 * (bins[:-1] + bins[1:])
+    centers_plot = binner.centers
 
     fig, ax = plt.subplots(figsize=(12, 5))
     plt.bar(centers_plot, occupancy, width=centers_plot[1]-centers_plot[0], color='C1', edgecolor='k', alpha=0.8)
@@ -48,11 +53,13 @@ def plot_spike_raster(spike_times: np.ndarray, duration: float, centers: np.arra
     if n_neurons != len(centers):
         raise ValueError("Number of neurons and number of centers must match.")
     
-    n_neurons = len(spike_times)
-    
     fig, ax = plt.subplots(figsize=(10, 2 + 0.5 * n_neurons))
-    for i in range(n_neurons):
-        plt.scatter(spike_times[i], np.ones_like(spike_times[i]) * i, s=10)
+    # one tick per spike, all drawn as a single LineCollection, one row per neuron in the default color cycle
+    rows = np.repeat(np.arange(n_neurons), [len(st) for st in spike_times])
+    times = np.concatenate([np.empty(0), *spike_times])  # empty array keeps n_neurons == 0 valid
+    ticks = np.stack([np.column_stack([times, rows - 0.4]), np.column_stack([times, rows + 0.4])], axis=1)
+    row_colors = np.array([to_rgba(f'C{i % 10}') for i in range(n_neurons)])
+    ax.add_collection(LineCollection(ticks, colors=row_colors[rows], linewidths=0.5))
     plt.yticks(np.arange(n_neurons), [f'Cell {i} (center={centers[i]:.2f} m)' for i in range(n_neurons)])
     plt.xlabel('Time (s)')
     plt.title('Spike raster')
@@ -63,39 +70,58 @@ def plot_spike_raster(spike_times: np.ndarray, duration: float, centers: np.arra
 
     return fig, ax
 
-def plot_empirical_vs_theoretical_rate(empirical_rates: np.ndarray, theoretical_rates: np.ndarray, 
-                                       bin_centers: np.ndarray, centers: np.ndarray, peak_rates: np.ndarray, 
-                                       x: np.ndarray, track_length: float):
+def plot_empirical_vs_theoretical_rate(empirical_rates: Union[np.ndarray, Iterable[Tuple[int, np.ndarray]]], 
+                                       theoretical_rates: np.ndarray, bin_centers: np.ndarray, centers: np.ndarray, 
+                                       peak_rates: np.ndarray, x: np.ndarray, track_length: float):
     """
     Plot empirical and theoretical rate maps for all neurons.
+
+    empirical_rates is either an (n_neurons, n_bins) array or an iterable of (neuron index, rate map) pairs,
+    such as the generator returned by iter_empirical_rate_maps, which is consumed one row at a time.
     """
     # Empirical rate maps vs theoretical
-    n_neurons = empirical_rates.shape[0]
+    n_neurons = theoretical_rates.shape[0]
 
-    if n_neurons != theoretical_rates.shape[0]:
-        raise ValueError("Number of neurons in empirical and theoretical rates must match.")
     if n_neurons != len(centers) or n_neurons != len(peak_rates):
         raise ValueError("Number of neurons and number of centers/peak rates must match.")
-    if empirical_rates.shape[1] != theoretical_rates.shape[1]:
+    if isinstance(empirical_rates, np.ndarray):
+        if empirical_rates.shape[0] != n_neurons:
+            raise ValueError("Number of neurons in empirical and theoretical rates must match.")
+        if empirical_rates.shape[1] != theoretical_rates.shape[1]:
+            raise ValueError("Empirical and theoretical rates must have the same number of position bins.")
+        if empirical_rates.shape[1] != len(bin_centers):
+            raise ValueError("Number of position bins in empirical rates and bin centers must match.")
+        empirical_rates = enumerate(empirical_rates)
+    elif len(bin_centers) != theoretical_rates.shape[1]:
         raise ValueError("Empirical and theoretical rates must have the same number of position bins.")
-    if empirical_rates.shape[1] != len(bin_centers):
-        raise ValueError("Number of position bins in empirical rates and bin centers must match.")
     
     fig, ax = plt.subplots(figsize=(10, 2 + 2 * n_neurons))
-    for i in range(n_neurons):
+    n_rows = 0
+    for i, empirical_rate in empirical_rates:
+        n_rows += 1
+        if i >= n_neurons or n_rows > n_neurons:
+            plt.close(fig)
+            raise ValueError("Number of neurons in empirical and theoretical rates must match.")
+        if len(empirical_rate) != len(bin_centers):
+            plt.close(fig)
+            raise ValueError("Number of position bins in empirical rates and bin centers must match.")
         plt.subplot(n_neurons, 1, i+1)
-        plt.plot(bin_centers, empirical_rates[i], label='Empirical rate (spikes / occupancy)')
+        plt.plot(bin_centers, empirical_rate, label='Empirical rate (spikes / occupancy)')
         plt.plot(x, theoretical_rates[i], label='Theoretical Gaussian rate', linestyle='--')
         plt.ylabel('Firing rate (Hz)')
         plt.title(f'Cell {i} place field: center={centers[i]:.2f} m, peak={peak_rates[i]} Hz')
         plt.xlim(0, track_length)
         plt.legend()
+    if n_rows != n_neurons:
+        plt.close(fig)
+        raise ValueError("Number of neurons in empirical and theoretical rates must match.")
     plt.xlabel('Position (m)')
     plt.tight_layout()
     plt.show()
     return fig, ax
 
-def plot_rate_maps(spikes: np.ndarray, positions: np.ndarray, times: np.ndarray, n_bins: int=50, smooth_sigma: float=1.0):
+def plot_rate_maps(spikes: np.ndarray, positions: np.ndarray, times: np.ndarray, n_bins: int=50, smooth_sigma: float=1.0,
+                   binner: Optional[Binner]=None):
     """
     Plot firing rate heatmap for a population of neurons on a 1D track.
     
@@ -111,36 +137,43 @@ def plot_rate_maps(spikes: np.ndarray, positions: np.ndarray, times: np.ndarray,
         Number of spatial bins along the track.
     smooth_sigma : float
         Standard deviation for Gaussian smoothing (in bins).
+    binner : Binner, optional
+        Precomputed bins along [0, track_length], used instead of n_bins bins spanning the visited positions.
     """
     n_cells = spikes.shape[0]
     
     # Bin positions
-    pos_bins = np.linspace(positions.min(), positions.max(), n_bins+1)
-    digitized = np.digitize(positions, pos_bins) - 1  # bin indices
+    if binner is not None:
+        n_bins = binner.n_bins
+        pos_bins = binner.edges
+        digitized = binner.indices(positions)
+    else:
+        pos_bins = np.linspace(positions.min(), positions.max(), n_bins+1)
+        # bin indices: bins are uniform, so index arithmetically instead of searching the edges
+        digitized = np.clip(((positions - pos_bins[0]) * (n_bins / (pos_bins[-1] - pos_bins[0]))).astype(np.intp), 
+                            0, n_bins - 1)
     
     # Occupancy (time spent in each position bin)
     dt = np.mean(np.diff(times))
-    occupancy = np.zeros(n_bins)
-    for b in range(n_bins):
-        occupancy[b] = np.sum(digitized == b) * dt
+    occupancy = np.bincount(digitized, minlength=n_bins).astype(float) * dt
     
-    # Avoid divide by zero
-    occupancy[occupancy == 0] = np.nan
+    # Spike counts per neuron per position bin: one bincount over neuron-offset bin indices
+    neuron_idx, time_idx = np.nonzero(spikes)
+    spike_counts = np.bincount(neuron_idx * n_bins + digitized[time_idx], 
+                               minlength=n_cells * n_bins).reshape(n_cells, n_bins).astype(float)
     
-    # Compute firing rate per neuron per position bin
-    rate_map = np.zeros((n_cells, n_bins))
-    for i in range(n_cells):
-        spike_counts, _ = np.histogram(positions[spikes[i] == 1], bins=pos_bins)
-        rate_map[i, :] = spike_counts / occupancy
-    
-    # Smooth along position axis
+    # Smooth counts and occupancy separately along the position axis, so unvisited bins don't spread NaNs
     if smooth_sigma > 0:
-        rate_map = gaussian_filter1d(rate_map, sigma=smooth_sigma, axis=1, mode="nearest")
+        occupancy = gaussian_filter1d(occupancy, sigma=smooth_sigma, mode="nearest")
+        spike_counts = gaussian_filter1d(spike_counts, sigma=smooth_sigma, axis=1, mode="nearest")
+    
+    # Firing rate, avoiding divide by zero
+    rate_map = spike_counts / np.where(occupancy > 0, occupancy, np.nan)
     
     # Plot heatmap
     fig, ax = plt.subplots(figsize=(10, 6))
     plt.imshow(rate_map, aspect="auto", origin="lower", 
-               extent=[positions.min(), positions.max(), 0, n_cells],
+               extent=[pos_bins[0], pos_bins[-1], 0, n_cells],
                cmap="viridis")
     plt.colorbar(label="Firing rate (Hz)")
     plt.xlabel("Position along track (m)")
@@ -2,10 +2,87 @@
 Generate synthetic spike trains for place cells and noise cells.
 """
 import numpy as np
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+
+# number of time steps converted from rates to spikes at once
+_CHUNK_STEPS = 4096
+# with truncated place fields, cells are skipped in blocks of this many time steps (divides _CHUNK_STEPS);
+# short blocks span a small stretch of track, so most cells have no field overlap in most blocks
+_BLOCK_STEPS = 64
+# above this fraction of (cell, block) pairs overlapping a field, one dense broadcast is cheaper
+_SPARSE_MAX_FRACTION = 0.5
+
+
+def _place_field_rates(pos: np.ndarray, centers: np.ndarray, half_inv_sigma2: np.ndarray, peak_rates: np.ndarray,
+                       baseline_rate: float, out: Optional[np.ndarray]=None) -> np.ndarray:
+    """
+    Gaussian place-field rates (Hz) for all neurons at the given positions, shape (n_neurons, len(pos)).
+    half_inv_sigma2 is -0.5 / sigma_pf**2, precomputed so the kernel only multiplies.
+    All steps run in place in a single float32 array, `out` if given.
+    """
+    if out is None:
+        out = np.empty((len(centers), len(pos)), dtype=np.float32)
+    np.subtract(pos[None, :], centers[:, None], out=out)
+    np.square(out, out=out)
+    out *= half_inv_sigma2[:, None]
+    np.exp(out, out=out)
+    out *= peak_rates[:, None]
+    out += np.float32(baseline_rate)
+    return out
+
+def _truncated_place_field_rates(block_pos: np.ndarray, centers: np.ndarray, half_inv_sigma2: np.ndarray, 
+                                 peak_rates: np.ndarray, baseline_rate: float, field_lo: np.ndarray, field_hi: np.ndarray,
+                                 out: np.ndarray) -> np.ndarray:
+    """
+    Place-field rates like _place_field_rates, for positions split into blocks, shape (n_blocks, _BLOCK_STEPS).
+    The Gaussian is only evaluated for (cell, block) pairs where the cell's truncated field [field_lo, field_hi]
+    overlaps the positions of the block; other pairs are set to baseline_rate. 
+    Writes into `out`, shape (n_neurons, n_blocks * _BLOCK_STEPS).
+    """
+    n_neurons, (n_blocks, block_steps) = len(centers), block_pos.shape
+    cells, blocks = np.nonzero((field_hi[:, None] >= block_pos.min(axis=1)) & (field_lo[:, None] <= block_pos.max(axis=1)))
+    if len(cells) > _SPARSE_MAX_FRACTION * n_neurons * n_blocks:
+        return _place_field_rates(block_pos.ravel(), centers, half_inv_sigma2, peak_rates, baseline_rate, out=out)
+
+    field = block_pos[blocks] - centers[cells, None]
+    np.square(field, out=field)
+    field *= half_inv_sigma2[cells, None]
+    np.exp(field, out=field)
+    field *= peak_rates[cells, None]
+    out.fill(baseline_rate)
+    out.reshape(n_neurons, n_blocks, block_steps)[cells, blocks] += field
+    return out
+
+def _split_by_neuron(values: np.ndarray, rows: np.ndarray, n_neurons: int) -> List[np.ndarray]:
+    """
+    Split values aligned with row-sorted neuron indices `rows` into one array per neuron.
+    """
+    if n_neurons == 0:
+        return []
+    return np.split(values, np.searchsorted(rows, np.arange(1, n_neurons)))
+
+def _candidate_events(rng: np.random.Generator, rates: np.ndarray, n_steps: int, dt: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sample homogeneous Poisson events at a constant rate (Hz) per neuron, quantized to time bins.
+    Returns the neuron index and time bin of every event. Cost is linear in the number of events.
+    """
+    counts = rng.poisson(np.asarray(rates, dtype=np.float64) * (n_steps * dt))
+    rows = np.repeat(np.arange(len(rates)), counts)
+    # given their number, Poisson event times are uniform over the duration
+    cols = rng.integers(0, n_steps, size=rows.size)
+    return rows, cols
+
+def _unique_events(rows: np.ndarray, cols: np.ndarray, n_steps: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sort events by neuron, then time bin, keeping at most one spike per bin as in the dense spike matrix.
+    """
+    keys = np.unique(rows.astype(np.int64) * n_steps + cols)
+    return keys // n_steps, keys % n_steps
 
 def generate_place_cell_spikes(centers: np.ndarray, sigma_pf: np.ndarray, peak_rates: np.ndarray, baseline_rate: float,
-                               pos: np.ndarray, time: np.ndarray, duration_s: float, dt: float, seed: Optional[int]=42) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+                               pos: np.ndarray, time: np.ndarray, duration_s: float, dt: float, seed: Optional[int]=42, 
+                               truncate: Optional[float]=4.0, format: str="dense"
+                               ) -> Tuple[Union[np.ndarray, List[np.ndarray]], List[np.ndarray], List[np.ndarray], np.ndarray]:
     
     """
     Generate spikes for place cells on a 1D track.
@@ -20,6 +97,16 @@ def generate_place_cell_spikes(centers: np.ndarray, sigma_pf: np.ndarray, peak_r
         Peak firing rates (Hz).
     baseline_rate : float
         Baseline firing rate (Hz).
+    truncate : float or None
+        Place fields are ignored beyond this many standard deviations from their center: a cell whose
+        truncated field does not reach any position visited during a block of 64 time steps fires at 
+        baseline_rate for that block, and its Gaussian is not evaluated there. None evaluates every field 
+        everywhere. Only used for format="dense".
+    format : {"dense", "events"}
+        "dense" draws a Bernoulli spike for every neuron and time step and returns the boolean spike matrix, 
+        shape (n_cells, n_steps). "events" samples spikes by thinning a Poisson process at each cell's peak 
+        rate, at a cost linear in the number of spikes, and returns a list of time-bin indices per cell in
+        place of the spike matrix.
     """
 
     if len(centers) != len(sigma_pf) or len(centers) != len(peak_rates):
@@ -31,37 +118,92 @@ def generate_place_cell_spikes(centers: np.ndarray, sigma_pf: np.ndarray, peak_r
     if len(pos) != len(time):
         raise ValueError("pos and time must have the same length.")
 
+    if format not in ("dense", "events"):
+        raise ValueError("format must be 'dense' or 'events'.")
+
     n_neurons = len(centers)
     n_steps = int(duration_s / dt)
-    rates = np.zeros((n_neurons, n_steps))
-    for i in range(n_neurons):
-        rates[i] = baseline_rate + peak_rates[i] * np.exp(-0.5 * ((pos - centers[i]) / sigma_pf[i])**2)
+    if len(pos) < n_steps:
+        raise ValueError("pos and time must cover duration_s / dt time steps.")
+    pos32 = np.asarray(pos, dtype=np.float32)
+    centers = np.asarray(centers, dtype=np.float32)
+    inv_sigma = (1.0 / np.asarray(sigma_pf, dtype=np.float64)).astype(np.float32)
+    half_inv_sigma2 = np.float32(-0.5) * inv_sigma * inv_sigma
+    peak_rates = np.asarray(peak_rates, dtype=np.float32)
+    if format == "dense" and truncate is not None:
+        reach = np.float32(truncate) * np.asarray(sigma_pf, dtype=np.float32)
+        field_lo, field_hi = centers - reach, centers + reach
+        # repeat the last position so that every chunk splits into whole blocks
+        n_padded = -(-n_steps // _BLOCK_STEPS) * _BLOCK_STEPS
+        pos_padded = np.empty(n_padded, dtype=np.float32)
+        pos_padded[:n_steps] = pos32[:n_steps]
+        pos_padded[n_steps:] = pos_padded[n_steps - 1] if n_steps else 0.0
 
-    # Generate spikes: Bernoulli approximation for inhomogeneous Poisson
     rng = np.random.default_rng(seed)  # new rng for spikes
-    spikes = rng.random(size=(n_neurons, n_steps)) < (rates * dt)
+    if format == "events":
+        # Thinning: candidates at the peak rate, each kept with probability rate(pos) / peak rate
+        max_rates = np.float32(baseline_rate) + peak_rates
+        rows, cols = _candidate_events(rng, max_rates, n_steps, dt)
+        dx = pos32[cols] - centers[rows]
+        rates = np.float32(baseline_rate) + peak_rates[rows] * np.exp(half_inv_sigma2[rows] * dx * dx)
+        keep = rng.random(size=rows.size, dtype=np.float32) * max_rates[rows] < rates
+        rows, cols = _unique_events(rows[keep], cols[keep], n_steps)
+    else:
+        # Generate spikes: Bernoulli approximation for inhomogeneous Poisson
+        # rates are computed chunk by chunk along time so the full rate matrix is never materialized
+        # rate and uniform buffers are allocated once and reused by every chunk
+        spikes = np.empty((n_neurons, n_steps), dtype=bool)
+        rate_buffer = np.empty(n_neurons * min(_CHUNK_STEPS, -(-n_steps // _BLOCK_STEPS) * _BLOCK_STEPS), dtype=np.float32)
+        uniform_buffer = np.empty_like(rate_buffer)
+        for start in range(0, n_steps, _CHUNK_STEPS):
+            stop = min(start + _CHUNK_STEPS, n_steps)
+            if truncate is None:
+                rates = rate_buffer[:n_neurons * (stop - start)].reshape(n_neurons, stop - start)
+                _place_field_rates(pos32[start:stop], centers, half_inv_sigma2, peak_rates, baseline_rate, out=rates)
+            else:
+                block_pos = pos_padded[start:start + _CHUNK_STEPS].reshape(-1, _BLOCK_STEPS)
+                rates = rate_buffer[:n_neurons * block_pos.size].reshape(n_neurons, block_pos.size)
+                _truncated_place_field_rates(block_pos, centers, half_inv_sigma2, peak_rates, baseline_rate, 
+                                             field_lo, field_hi, out=rates)
+                rates = rates[:, :stop - start]
+            rates *= np.float32(dt)
+            uniforms = uniform_buffer[:n_neurons * (stop - start)].reshape(n_neurons, stop - start)
+            rng.random(dtype=np.float32, out=uniforms)
+            np.less(uniforms, rates, out=spikes[:, start:stop])
+        # scan the spike matrix once
+        rows, cols = np.nonzero(spikes)
 
-    # Extract spike times and positions
-    spike_times = [time[spikes[i]] for i in range(n_neurons)]
-    spike_positions = [pos[spikes[i]] for i in range(n_neurons)]
-    spike_counts = np.sum(spikes, axis=1)
+    # Extract spike times and positions: split the row-sorted spikes by neuron
+    if format == "events":
+        spikes = _split_by_neuron(cols, rows, n_neurons)
+    spike_times = _split_by_neuron(time[cols], rows, n_neurons)
+    spike_positions = _split_by_neuron(pos[cols], rows, n_neurons)
+    spike_counts = np.bincount(rows, minlength=n_neurons)
 
     return spikes, spike_times, spike_positions, spike_counts
 
 def generate_noise_cell_spikes(n_noise: int, min_rate: int, max_rate: int, duration_s: float, 
-                                dt: float, seed: Optional[int]=42) -> Tuple[np.ndarray]:
+                                dt: float, seed: Optional[int]=42, format: str="dense") -> Union[np.ndarray, List[np.ndarray]]:
     """
     Generate spikes for noise cells (firing independent of position) on a 1D track.
+
+    With format="dense" returns the boolean spike matrix, shape (n_noise, n_steps). With format="events"
+    spikes are sampled directly as Poisson events, at a cost linear in the number of spikes, and a list 
+    of time-bin indices per cell is returned instead.
     """
+    if format not in ("dense", "events"):
+        raise ValueError("format must be 'dense' or 'events'.")
 
     noise_rates = np.random.uniform(min_rate, max_rate, size=n_noise)  # Hz, random per neuron
 
-    # expand rates to all timesteps
     n_steps = int(duration_s / dt)
-    noise_rates_matrix = noise_rates[:, None] * np.ones((n_noise, n_steps))
 
-    # simulate spikes: Bernoulli draws
     rng = np.random.default_rng(seed)
-    noise_spikes = rng.random(size=(n_noise, n_steps)) < (noise_rates_matrix * dt)
+    if format == "events":
+        rows, cols = _unique_events(*_candidate_events(rng, noise_rates, n_steps, dt), n_steps)
+        return _split_by_neuron(cols, rows, n_noise)
+
+    # simulate spikes: Bernoulli draws
+    noise_spikes = rng.random(size=(n_noise, n_steps)) < (noise_rates[:, None] * dt)
 
     return noise_spikes
\ No newline at end of file
@@ -2,38 +2,114 @@
 """
 Additional utility functions.
 """
-from typing import Dict, Any, Tuple
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, Iterator, Optional, Tuple
 import numpy as np
 import json
 import os
 
-def save_dataset(dataset: Dict[str, Any], out_file: str) -> None:
+def save_dataset(dataset: Dict[str, Any], out_file: str, compress: bool = False) -> None:
     """
-    Save dataset to compressed npz. meta is JSON-serialized.
+    Save dataset to npz. meta is JSON-serialized.
+
+    Arrays are stored uncompressed by default: OU trajectories compress poorly and zlib dominates the
+    write time. Use compress=True for archival copies.
     """
     os.makedirs(os.path.dirname(out_file) or ".", exist_ok=True)
     meta = json.dumps(dataset.get("meta", {}))
-    np.savez_compressed(out_file, time=dataset["time"], pos=dataset["pos"], vel=dataset["vel"], spikes=dataset["spikes"],
-                         noise_spikes=dataset["noise_spikes"],  meta=meta)
+    savez = np.savez_compressed if compress else np.savez
+    savez(out_file, time=dataset["time"], pos=dataset["pos"], vel=dataset["vel"], spikes=dataset["spikes"],
+          noise_spikes=dataset["noise_spikes"],  meta=meta)
+
+
+@dataclass(frozen=True, eq=False)
+class Binner:
+    """
+    Uniform position bins along [0, track_length]. 
+
+    Build with Binner.from_track, which caches instances so repeated calls (e.g. in parameter sweeps) reuse 
+    the same read-only edges and centers.
+    """
+    track_length: float
+    n_bins: int
+    edges: np.ndarray
+    centers: np.ndarray
+    inv_width: float
+
+    @classmethod
+    def from_track(cls, track_length: float, n_bins: int) -> "Binner":
+        return _cached_binner(float(track_length), int(n_bins))
+
+    def indices(self, x: np.ndarray) -> np.ndarray:
+        """
+        Index of the bin containing each value, clipped to [0, n_bins - 1].
+        """
+        return np.clip((np.asarray(x, dtype=np.float64) * self.inv_width).astype(np.intp), 0, self.n_bins - 1)
+
+
+@lru_cache(maxsize=32)
+def _cached_binner(track_length: float, n_bins: int) -> Binner:
+    edges = np.linspace(0, track_length, n_bins + 1)
+    centers = 0.5 * (edges[:-1] + edges[1:])
+    edges.flags.writeable = False
+    centers.flags.writeable = False
+    return Binner(track_length, n_bins, edges, centers, n_bins / track_length)
+
+
+def _occupancy_time(binner: Binner, pos: np.ndarray, dt: float) -> np.ndarray:
+    """
+    Time (s) spent in each position bin.
+    """
+    return np.bincount(binner.indices(pos), minlength=binner.n_bins) * dt
 
 
 def compute_empirical_rate_maps(n_bins: int, track_length: float, pos: np.ndarray, dt: float, 
-                                spike_positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+                                spike_positions: np.ndarray, binner: Optional[Binner] = None) -> Tuple[np.ndarray, np.ndarray]:
     """
     Compute empirical rate maps for all neurons.
+
+    If given, binner is used instead of the bins defined by n_bins and track_length.
     """
+    if binner is None:
+        binner = Binner.from_track(track_length, n_bins)
     n_neurons = len(spike_positions)
-    bins = np.linspace(0, track_length, n_bins + 1)
-    bin_centers = 0.5 * (bins[:-1] + bins[1:])
-    occupancy, _ = np.histogram(pos, bins=bins)
-    occupancy_time = occupancy * dt
-    empirical_rate_maps = np.zeros((n_neurons, n_bins))
-    for i in range(n_neurons):
-        sc, _ = np.histogram(spike_positions[i], bins=bins)
-        with np.errstate(divide='ignore', invalid='ignore'):
-            empirical_rate_maps[i] = np.where(occupancy_time > 0, sc / occupancy_time, 0.0)
+    n_bins = binner.n_bins
+    occupancy_time = _occupancy_time(binner, pos, dt)
+
+    # spike counts of all neurons in a single bincount, offsetting each neuron's bins by neuron_id * n_bins
+    n_spikes = [len(sp) for sp in spike_positions]
+    neuron_ids = np.repeat(np.arange(n_neurons), n_spikes)
+    spike_bins = binner.indices(np.concatenate([np.empty(0), *spike_positions]))  # empty array keeps n_neurons == 0 valid
+    sc = np.bincount(neuron_ids * n_bins + spike_bins, minlength=n_neurons * n_bins).reshape(n_neurons, n_bins)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        empirical_rate_maps = np.where(occupancy_time > 0, sc / occupancy_time, 0.0)
     
-    return empirical_rate_maps, bin_centers
+    # callers get their own writable bin centers; the cached array stays read-only
+    return empirical_rate_maps, binner.centers.copy()
+
+def iter_empirical_rate_maps(n_bins: int, track_length: float, pos: np.ndarray, dt: float, spike_positions: np.ndarray, 
+                             binner: Optional[Binner] = None) -> Tuple[Iterator[Tuple[int, np.ndarray]], np.ndarray]:
+    """
+    Lazily compute empirical rate maps, one neuron at a time.
+
+    Returns a generator of (neuron index, rate map) pairs and the bin centers. Rows match those of 
+    compute_empirical_rate_maps, but only one is held in memory at a time.
+    If given, binner is used instead of the bins defined by n_bins and track_length.
+    """
+    if binner is None:
+        binner = Binner.from_track(track_length, n_bins)
+    occupancy_time = _occupancy_time(binner, pos, dt)
+
+    def rows() -> Iterator[Tuple[int, np.ndarray]]:
+        for i, sp in enumerate(spike_positions):
+            sc = np.bincount(binner.indices(sp), minlength=binner.n_bins)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                row = np.where(occupancy_time > 0, sc / occupancy_time, 0.0)
+            # yield outside errstate so the caller's error settings apply while the generator is paused
+            yield i, row
+
+    return rows(), binner.centers.copy()
 
 def compute_theoretical_rate_maps(n_bins: int, track_length: float, centers: np.ndarray, sigma_pf: np.ndarray, peak_rates: np.ndarray, 
                                   baseline_rate: float) -> Tuple[np.ndarray, np.ndarray]:
@@ -44,10 +120,13 @@ def compute_theoretical_rate_maps(n_bins: int, track_length: float, centers: np.
     if len(centers) != len(sigma_pf) or len(centers) != len(peak_rates):
         raise ValueError("Length of centers, sigma_pf, and peak_rates must match.")
     
-    n_neurons = len(centers)    
     x = np.linspace(0, track_length, n_bins)
-    theoretical_rates = np.zeros((n_neurons, x.size))
-    for i in range(n_neurons):
-        theoretical_rates[i] = baseline_rate + peak_rates[i] * np.exp(-0.5 * ((x - centers[i]) / sigma_pf[i])**2)
+    x32 = x.astype(np.float32)
+    centers = np.asarray(centers, dtype=np.float32)
+    inv_sigma = (1.0 / np.asarray(sigma_pf, dtype=np.float64)).astype(np.float32)
+    half_inv_sigma2 = np.float32(-0.5) * inv_sigma * inv_sigma
+    peak_rates = np.asarray(peak_rates, dtype=np.float32)
+    dx = x32[None, :] - centers[:, None]
+    theoretical_rates = np.float32(baseline_rate) + peak_rates[:, None] * np.exp(half_inv_sigma2[:, None] * dx * dx)
 
     return theoretical_rates, x
\ No newline at end of file